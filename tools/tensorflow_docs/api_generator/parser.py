@@ -17,6 +17,7 @@
 
 import dataclasses
 import enum
+import functools
 import inspect
 import os
 import posixpath
@@ -24,6 +25,7 @@ import pprint
 import re
 import textwrap
 import typing
+import weakref
 
 from typing import Any, Dict, List, Tuple, Iterable, Optional, Union
 
@@ -32,7 +34,7 @@ from tensorflow_docs.api_generator import doc_generator_visitor
 from tensorflow_docs.api_generator import obj_type as obj_type_lib
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(frozen=True)
 class FileLocation(object):
   """This class indicates that the object is defined in a regular file.
 
@@ -42,12 +44,21 @@ class FileLocation(object):
   base_url: Optional[str] = None
   start_line: Optional[int] = None
   end_line: Optional[int] = None
+  # Only github supports linking to a range of lines.
+  _link_lines: bool = dataclasses.field(
+      init=False, repr=False, compare=False, default=False)
+
+  def __post_init__(self):
+    link_lines = bool(self.start_line and self.end_line and
+                      self.base_url is not None and
+                      'github.com' in self.base_url)
+    # The dataclass is frozen, so bypass its `__setattr__`.
+    object.__setattr__(self, '_link_lines', link_lines)
 
   @property
   def url(self) -> Optional[str]:
-    if self.start_line and self.end_line:
-      if 'github.com' in self.base_url:
-        return f'{self.base_url}#L{self.start_line}-L{self.end_line}'
+    if self._link_lines:
+      return f'{self.base_url}#L{self.start_line}-L{self.end_line}'
     return self.base_url
 
 
@@ -85,47 +96,84 @@ def documentation_path(full_name, is_fragment=False):
   Returns:
     The file path to which to write the documentation for `full_name`.
   """
-  parts = full_name.split('.')
-  if is_fragment:
-    parts, fragment = parts[:-1], parts[-1]
+  if not is_fragment:
+    return full_name.replace('.', '/') + '.md'
+
+  page, _, fragment = full_name.rpartition('.')
+  return page.replace('.', '/') + '.md#' + fragment
+
+
+def _memoize_by_id(fn):
+  """Memoizes a single argument function per `ParserConfig`.
+
+  Results are keyed by the `id` of the argument, so unlike
+  `functools.lru_cache` this works for unhashable objects. Each cache holds a
+  reference to its arguments so that their `id`s can't be reused while the
+  entries exist, and is dropped along with its `ParserConfig`. Calls without a
+  `parser_config` are not cached.
+
+  Args:
+    fn: The function to memoize.
+
+  Returns:
+    The memoized function, taking an extra optional `parser_config` argument.
+  """
+  caches = weakref.WeakKeyDictionary()
+
+  @functools.wraps(fn)
+  def wrapper(obj, parser_config: Optional[config.ParserConfig] = None):
+    if parser_config is None:
+      return fn(obj)
+    cache = caches.get(parser_config)
+    if cache is None:
+      cache = {}
+      caches[parser_config] = cache
+    entry = cache.get(id(obj))
+    if entry is None:
+      entry = (obj, fn(obj))
+      cache[id(obj)] = entry
+    return entry[1]
 
-  result = posixpath.join(*parts) + '.md'
+  return wrapper
 
-  if is_fragment:
-    result = result + '#' + fragment
 
-  return result
+# The same objects (base classes, inherited members, the types of constants)
+# are documented on many pages, so only clean each docstring once per run.
+_getdoc = _memoize_by_id(inspect.getdoc)
 
 
-def _get_raw_docstring(py_object):
+def _get_raw_docstring(py_object,
+                       parser_config: Optional[config.ParserConfig] = None):
   """Get the docs for a given python object.
 
   Args:
     py_object: A python object to retrieve the docs for (class, function/method,
       or module).
+    parser_config: An optional config.ParserConfig, used to cache docstrings.
 
   Returns:
     The docstring, or the empty string if no docstring was found.
   """
 
-  if obj_type_lib.ObjType.get(py_object) is obj_type_lib.ObjType.TYPE_ALIAS:
-    if inspect.getdoc(py_object) != inspect.getdoc(py_object.__origin__):
-      result = inspect.getdoc(py_object)
-    else:
+  obj_type = obj_type_lib.ObjType.get(py_object)
+  if obj_type is obj_type_lib.ObjType.TYPE_ALIAS:
+    result = _getdoc(py_object, parser_config)
+    if result == _getdoc(py_object.__origin__, parser_config):
       result = ''
-  elif obj_type_lib.ObjType.get(py_object) is not obj_type_lib.ObjType.OTHER:
-    result = inspect.getdoc(py_object) or ''
+  elif obj_type is not obj_type_lib.ObjType.OTHER:
+    result = _getdoc(py_object, parser_config) or ''
   else:
     result = ''
 
   if result is None:
     result = ''
 
-  result = _StripTODOs()(result)
-  result = _StripPylintAndPyformat()(result)
-  result = _AddDoctestFences()(result + '\n')
-  result = _DowngradeH1Keywords()(result)
-  return result
+  result = _STRIP_TODOS_RE.sub('', result)
+  result = _STRIP_PYLINT_AND_PYFORMAT_RE.sub('', result)
+  result = _ADD_DOCTEST_FENCES(result + '\n')
+  result = _DOWNGRADE_H1_KEYWORDS(result)
+  # Drop the new-line added for `_AddDoctestFences`.
+  return result[:-1]
 
 
 class _AddDoctestFences(object):
@@ -148,18 +196,10 @@ class _AddDoctestFences(object):
     return self.CARET_BLOCK_RE.sub(self._sub, content)
 
 
-class _StripTODOs(object):
-  TODO_RE = re.compile('#? *TODO.*')
-
-  def __call__(self, content: str) -> str:
-    return self.TODO_RE.sub('', content)
-
-
-class _StripPylintAndPyformat(object):
-  STRIP_RE = re.compile('# *?(pylint|pyformat):.*', re.I)
-
-  def __call__(self, content: str) -> str:
-    return self.STRIP_RE.sub('', content)
+# TODOs are stripped before pylint/pyformat comments. Two simple patterns are
+# faster than one alternation of both.
+_STRIP_TODOS_RE = re.compile('#? *TODO.*')
+_STRIP_PYLINT_AND_PYFORMAT_RE = re.compile('# *?(pylint|pyformat):.*', re.I)
 
 
 class _DowngradeH1Keywords():
@@ -167,28 +207,50 @@ class _DowngradeH1Keywords():
 
   KEYWORD_H1_RE = re.compile(
       r"""
-    ^                 # Start of line
-    (?P<indent>\s*)   # Capture leading whitespace as <indent
-    \#\s*             # A literal "#" and more spaces
-                      # Capture any of these keywords as <keyword>
+    ^                     # Start of line
+    (?P<indent>[^\S\n]*)  # Capture leading whitespace as <indent
+    \#[^\S\n]*            # A literal "#" and more spaces
+                          # Capture any of these keywords as <keyword>
     (?P<keyword>Args|Arguments|Returns|Raises|Yields|Examples?|Notes?)
-    \s*:?             # Optional whitespace and optional ":"
-    """, re.VERBOSE)
+    [^\S\n]*:?            # Optional whitespace and optional ":"
+    """, re.VERBOSE | re.MULTILINE)
+
+  # Matches a ``` fenced code block, from the opening fence line through the
+  # closing fence line (or the end of the string if the fence is never closed).
+  CODE_BLOCK_RE = re.compile(
+      r"""
+    (
+      ^[^\S\n]*```[^\n]*              # The opening fence line.
+      (?:\n(?![^\S\n]*```)[^\n]*)*    # Any lines that are not fences.
+      (?:\n[^\S\n]*```[^\n]*)?        # The closing fence line.
+    )
+    """, re.VERBOSE | re.MULTILINE)
+
+  # The line boundaries `str.splitlines` recognizes, other than "\n".
+  LINE_BREAKS = '\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029'
+  LINE_BREAK_RE = re.compile(r'\r\n?|[\x0b\x0c\x1c-\x1e\x85\u2028\u2029]')
 
   def __call__(self, docstring):
-    lines = docstring.splitlines()
+    # Treat every line boundary as a "\n", like the `splitlines` this replaced.
+    # They are rare, and checking for each one is faster than an unneeded sub.
+    if any(char in docstring for char in self.LINE_BREAKS):
+      docstring = self.LINE_BREAK_RE.sub('\n', docstring)
+    # `re.split` with a capturing group alternates between text and code.
+    chunks = self.CODE_BLOCK_RE.split(docstring)
+    for i in range(0, len(chunks), 2):
+      chunks[i] = self.KEYWORD_H1_RE.sub(r'\g<indent>\g<keyword>:', chunks[i])
+
+    return ''.join(chunks)
 
-    new_lines = []
-    is_code = False
-    for line in lines:
-      if line.strip().startswith('```'):
-        is_code = not is_code
-      elif not is_code:
-        line = self.KEYWORD_H1_RE.sub(r'\g<indent>\g<keyword>:', line)
-      new_lines.append(line)
 
-    docstring = '\n'.join(new_lines)
-    return docstring
+_ADD_DOCTEST_FENCES = _AddDoctestFences()
+_DOWNGRADE_H1_KEYWORDS = _DowngradeH1Keywords()
+
+
+_COMPATIBILITY_RE = re.compile(
+    r'[ \t]*@compatibility\(([^\n]+?)\)\s*\n'
+    r'(.*?)'
+    r'[ \t]*@end_compatibility', re.DOTALL)
 
 
 def _handle_compatibility(doc) -> Tuple[str, Dict[str, str]]:
@@ -202,13 +264,43 @@ def _handle_compatibility(doc) -> Tuple[str, Dict[str, str]]:
     note type to the text of the note.
   """
   compatibility_notes = {}
-  match_compatibility = re.compile(
-      r'[ \t]*@compatibility\(([^\n]+?)\)\s*\n'
-      r'(.*?)'
-      r'[ \t]*@end_compatibility', re.DOTALL)
-  for f in match_compatibility.finditer(doc):
-    compatibility_notes[f.group(1)] = f.group(2)
-  return match_compatibility.subn(r'', doc)[0], compatibility_notes
+
+  def _collect_note(match):
+    compatibility_notes[match.group(1)] = match.group(2)
+    return ''
+
+  # Collect the notes while removing them, so `doc` is only scanned once.
+  doc = _COMPATIBILITY_RE.sub(_collect_note, doc)
+  return doc, compatibility_notes
+
+
+_WHITESPACE_ONLY_LINE_RE = re.compile('^[ \t]+$', re.MULTILINE)
+
+
+def _dedent(text):
+  """Equivalent to `textwrap.dedent`, but faster for text with many lines.
+
+  `textwrap.dedent` finds the margin with a regex over every line and a python
+  loop over the results. The margin is also the leading whitespace of the
+  longest common prefix of the non-blank lines, which `os.path.commonprefix`
+  finds by only comparing the smallest and largest line.
+
+  Args:
+    text: The text to dedent.
+
+  Returns:
+    The text with the common leading whitespace removed from every line, and
+    whitespace-only lines emptied.
+  """
+  text = _WHITESPACE_ONLY_LINE_RE.sub('', text)
+  prefix = os.path.commonprefix(list(filter(None, text.split('\n'))))
+  margin = prefix[:len(prefix) - len(prefix.lstrip(' \t'))]
+  if margin:
+    # Every non-blank line starts with `margin`, and blank lines are empty.
+    if text.startswith(margin):
+      text = text[len(margin):]
+    text = text.replace('\n' + margin, '\n')
+  return text
 
 
 def _pairs(items):
@@ -221,7 +313,9 @@ def _pairs(items):
     A list of pairs.
   """
   assert len(items) % 2 == 0
-  return list(zip(items[::2], items[1::2]))
+  # `zip` pulls alternately from the same iterator.
+  items = iter(items)
+  return list(zip(items, items))
 
 
 # Don't change the width="214px" without consulting with the devsite-team.
@@ -304,7 +398,7 @@ class TitleBlock(object):
       return text
 
     first, remainder = text.split('\n', 1)
-    remainder = textwrap.dedent(remainder)
+    remainder = _dedent(remainder)
     result = '\n'.join([first, remainder])
     return result
 
@@ -362,16 +456,25 @@ class TitleBlock(object):
 
     return ''.join(sub)
 
+  # The title and content of a title-block.
+  _BLOCK_BODY_RE = r"""
+        (?P<title>[A-Z][\s\w]{0,20})  # Find a sentence case title, followed by
+          \s*:\s*?(?=\n)              # whitespace, a colon and a new line.
+      (?P<content>                    # Then take every line until a
+        [^\n]*                        # non-indented line (a new-line followed
+        (?:\n(?!\S|\Z)[^\n]*)*        # by non-whitespace) or the final
+      )                               # new-line.
+    """
+
   # This regex matches an entire title-block.
   BLOCK_RE = re.compile(
       r"""
       (?:^|^\n|\n\n)                  # After a blank line (non-capturing):
-        (?P<title>[A-Z][\s\w]{0,20})  # Find a sentence case title, followed by
-          \s*:\s*?(?=\n)              # whitespace, a colon and a new line.
-      (?P<content>.*?)                # Then take everything until
-        (?=\n\S|$)                    # look ahead finds a non-indented line
-                                      # (a new-line followed by non-whitespace)
-    """, re.VERBOSE | re.DOTALL)
+      """ + _BLOCK_BODY_RE, re.VERBOSE)
+
+  # This regex matches a title-block that starts right where the previous one
+  # ended. Only the first `TitleBlock` in a series needs a blank line before it.
+  NEXT_BLOCK_RE = re.compile(r'\n' + _BLOCK_BODY_RE, re.VERBOSE)
 
   ITEM_RE = re.compile(
       r"""
@@ -421,30 +524,31 @@ class TitleBlock(object):
       `str` is called on it (each chunk is a python `str`, or a `TitleBlock`).
     """
     parts = []
-    while docstring:
-      split = re.split(cls.BLOCK_RE, docstring, maxsplit=1)
-      # The first chunk in split is all text before the TitleBlock.
-      before = split.pop(0)
-      parts.append(before)
-
-      # If `split` is empty, there were no other matches, and we're done.
-      if not split:
-        break
-
-      # If there was a match,  split contains three items. The two capturing
-      # groups in the RE, and the remainder.
-      title, content, docstring = split
+    pos = 0
+    match = cls.BLOCK_RE.search(docstring)
+    while match is not None:
+      # The text from the end of the last TitleBlock to the start of this one.
+      parts.append(docstring[pos:match.start()])
 
       # Now `content` contains the text and the name-value item pairs.
       # separate these two parts.
-      content = textwrap.dedent(content)
+      content = _dedent(match.group('content'))
       split = cls.ITEM_RE.split(content)
       text = split.pop(0)
       items = _pairs(split)
 
-      title_block = cls(title=title, text=text, items=items)
+      title_block = cls(title=match.group('title'), text=text, items=items)
       parts.append(title_block)
 
+      pos = match.end()
+      match = (
+          cls.NEXT_BLOCK_RE.match(docstring, pos) or
+          cls.BLOCK_RE.search(docstring, pos))
+
+    # Any text after the last TitleBlock.
+    if pos < len(docstring):
+      parts.append(docstring[pos:])
+
     return parts
 
 
@@ -462,8 +566,8 @@ def _get_other_member_doc(
   """Returns the docs for other members of a module."""
 
   # An object's __doc__ attribute will mask the class'.
-  my_doc = inspect.getdoc(obj)
-  class_doc = inspect.getdoc(type(obj))
+  my_doc = _getdoc(obj, parser_config)
+  class_doc = _getdoc(type(obj), parser_config)
 
   description = None
   if my_doc != class_doc:
@@ -477,16 +581,18 @@ def _get_other_member_doc(
   info = None
   if isinstance(obj, dict):
     # pprint.pformat (next block) doesn't sort dicts until python 3.8
-    items = [
-        f' {name!r}: {value!r}'
-        for name, value in sorted(obj.items(), key=repr)
-    ]
-    items = ',\n'.join(items)
+    # Sort by `repr((name, value))`, built from the reprs the items need anyway.
+    items = []
+    for name, value in obj.items():
+      name, value = repr(name), repr(value)
+      items.append((f'({name}, {value})', f' {name}: {value}'))
+    items = ',\n'.join(item for _, item in sorted(items))
     info = f'```\n{{\n{items}\n}}\n```'
 
   elif isinstance(obj, (set, frozenset)):
     # pprint.pformat (next block) doesn't sort dicts until python 3.8
-    items = [f' {value!r}' for value in sorted(obj, key=repr)]
+    # Sorting the items sorts by `repr`, the leading space doesn't change that.
+    items = sorted(f' {value!r}' for value in obj)
     items = ',\n'.join(items)
     info = f'```\n{{\n{items}\n}}\n```'
   elif (doc_generator_visitor.maybe_singleton(obj) or
@@ -516,6 +622,14 @@ def _get_other_member_doc(
   return '\n\n'.join(parts)
 
 
+# Matches whole `@@symbol` lines, so they can be removed. A line is removed with
+# its trailing new-line, except for the `@@` lines that end the docstring: those
+# are removed with the new-line before them.
+_ATAT_LINE_RE = re.compile(
+    r'\n(?: *@@[a-zA-Z_.0-9]+ *\n)* *@@[a-zA-Z_.0-9]+ *\Z|'
+    r'^ *@@[a-zA-Z_.0-9]+ *(?:\n|\Z)', re.MULTILINE)
+
+
 def parse_md_docstring(
     py_object: Any,
     full_name: str,
@@ -544,14 +658,14 @@ def parse_md_docstring(
     raw_docstring = _get_other_member_doc(
         obj=py_object, parser_config=parser_config, extra_docs=extra_docs)
   else:
-    raw_docstring = _get_raw_docstring(py_object)
+    raw_docstring = _get_raw_docstring(py_object, parser_config)
 
   raw_docstring = parser_config.reference_resolver.replace_references(
       raw_docstring, full_name)
 
-  atat_re = re.compile(r' *@@[a-zA-Z_.0-9]+ *$')
-  raw_docstring = '\n'.join(
-      line for line in raw_docstring.split('\n') if not atat_re.match(line))
+  # Most docstrings have no `@@` lines, so skip the regex scan for those.
+  if '@@' in raw_docstring:
+    raw_docstring = _ATAT_LINE_RE.sub('', raw_docstring)
 
   docstring, compatibility = _handle_compatibility(raw_docstring)
 
@@ -577,12 +691,53 @@ def get_defining_class(py_class, name):
 
 
 def _unwrap_obj(obj):
-  while True:
-    unwrapped_obj = getattr(obj, '__wrapped__', None)
-    if unwrapped_obj is None:
-      break
-    obj = unwrapped_obj
-  return obj
+  try:
+    # Stop at a `__wrapped__` of `None` instead of returning it.
+    return inspect.unwrap(obj, stop=lambda f: f.__wrapped__ is None)
+  except ValueError:  # unwrap throws ValueError if it finds a cycle.
+    return obj
+
+
+@_memoize_by_id
+def _get_source_lines(py_object) -> Optional[Tuple[List[str], int]]:
+  """A memoized `inspect.getsourcelines`, returns `None` if it fails."""
+  try:
+    return inspect.getsourcelines(py_object)
+  except (IOError, TypeError, IndexError):
+    return None
+
+
+# Maps each `ParserConfig` to its `(base_dir, code_url_prefix)` pairs.
+_BASE_DIRS_AND_PREFIXES = weakref.WeakKeyDictionary()
+
+
+def _get_base_dirs_and_prefixes(
+    parser_config: config.ParserConfig) -> Tuple[Tuple[str, str], ...]:
+  """Returns the `(base_dir, code_url_prefix)` pairs of the `parser_config`.
+
+  These are only built once per `ParserConfig`. Each `base_dir` is returned as
+  an absolute, case-normalized path, ending with a separator.
+
+  Args:
+    parser_config: A config.ParserConfig object.
+
+  Returns:
+    A tuple of `(base_dir, code_url_prefix)` pairs.
+  """
+  base_dirs_and_prefixes = _BASE_DIRS_AND_PREFIXES.get(parser_config)
+  if base_dirs_and_prefixes is None:
+    base_dirs_and_prefixes = tuple(
+        (os.path.join(os.path.normcase(os.path.abspath(base_dir)), ''),
+         code_url_prefix)
+        for base_dir, code_url_prefix in zip(parser_config.base_dir,
+                                             parser_config.code_url_prefix))
+    _BASE_DIRS_AND_PREFIXES[parser_config] = base_dirs_and_prefixes
+  return base_dirs_and_prefixes
+
+
+_BRACKET_PATH_RE = re.compile(r'<[\w\s]+>')
+_GEN_PY_RE = re.compile(r'.*/gen_[^/]*\.py$')
+_PB2_RE = re.compile(r'.*_pb2\.py$')
 
 
 def get_defined_in(
@@ -598,8 +753,7 @@ def get_defined_in(
     A `FileLocation`
   """
   # Every page gets a note about where this object is defined
-  base_dirs_and_prefixes = zip(parser_config.base_dir,
-                               parser_config.code_url_prefix)
+  base_dirs_and_prefixes = _get_base_dirs_and_prefixes(parser_config)
   try:
     obj_path = inspect.getfile(_unwrap_obj(py_object))
   except TypeError:  # getfile throws TypeError if py_object is a builtin.
@@ -608,15 +762,24 @@ def get_defined_in(
   if not obj_path.endswith(('.py', '.pyc')):
     return None
 
+  # Normalize `obj_path` once, so the base_dirs can be checked with a prefix
+  # test instead of an `os.path.relpath` per base_dir. `normcase` only changes
+  # case and separators, so `obj_path` and `norm_path` have the same length.
+  obj_path = os.path.abspath(obj_path)
+  norm_path = os.path.normcase(obj_path)
   code_url_prefix = None
   for base_dir, temp_prefix in base_dirs_and_prefixes:
-    rel_path = os.path.relpath(path=obj_path, start=base_dir)
-    # A leading ".." indicates that the file is not inside `base_dir`, and
-    # the search should continue.
-    if rel_path.startswith('..'):
+    if norm_path + os.sep == base_dir:
+      # A single file module is its own `base_dir`.
+      code_url_prefix = temp_prefix
+      rel_path = os.curdir
+      break
+    # If the file is not inside `base_dir`, the search should continue.
+    if not norm_path.startswith(base_dir):
       continue
     else:
       code_url_prefix = temp_prefix
+      rel_path = obj_path[len(base_dir):]
       # rel_path is currently a platform-specific path, so we need to convert
       # it to a posix path (for lack of a URL path).
       rel_path = posixpath.join(*rel_path.split(os.path.sep))
@@ -626,13 +789,14 @@ def get_defined_in(
   if code_url_prefix is None:
     return None
 
-  try:
-    lines, start_line = inspect.getsourcelines(py_object)
+  source_lines = _get_source_lines(py_object, parser_config)
+  if source_lines is not None and source_lines[0]:
+    lines, start_line = source_lines
     end_line = start_line + len(lines) - 1
     if 'MACHINE GENERATED' in lines[0]:
       # don't link to files generated by tf_export
       return None
-  except (IOError, TypeError, IndexError):
+  else:
     start_line = None
     end_line = None
 
@@ -644,17 +808,17 @@ def get_defined_in(
     # .cpython-3x.pyc or similar are all handled.
     rel_path = rel_path.partition('.')[0] + '.py'
 
-  if re.search(r'<[\w\s]+>', rel_path):
+  if _BRACKET_PATH_RE.search(rel_path):
     # Built-ins emit paths like <embedded stdlib>, <string>, etc.
     return None
   if '<attrs generated' in rel_path:
     return None
 
-  if re.match(r'.*/gen_[^/]*\.py$', rel_path):
+  if _GEN_PY_RE.match(rel_path):
     return FileLocation()
   if 'genfiles' in rel_path:
     return FileLocation()
-  elif re.match(r'.*_pb2\.py$', rel_path):
+  elif _PB2_RE.match(rel_path):
     # The _pb2.py files all appear right next to their defining .proto file.
     rel_path = rel_path[:-7] + '.proto'
     return FileLocation(base_url=posixpath.join(code_url_prefix, rel_path))
@@ -680,7 +844,10 @@ def generate_global_index(library_name, index, reference_resolver):
   Returns:
     A string containing an index page as Markdown.
   """
-  symbol_links = []
+  compat_v1_symbol_links = []
+  compat_v2_symbol_links = []
+  primary_symbol_links = []
+
   for full_name, py_object in index.items():
     obj_type = obj_type_lib.ObjType.get(py_object)
     if obj_type in (obj_type_lib.ObjType.OTHER, obj_type_lib.ObjType.PROPERTY):
@@ -689,6 +856,18 @@ def generate_global_index(library_name, index, reference_resolver):
     if obj_type is obj_type_lib.ObjType.CALLABLE:
       if is_class_attr(full_name, index):
         continue
+
+    # Break the symbols up into main symbols and compat symbols as they're
+    # found, so links aren't built for symbols that are skipped.
+    if full_name.startswith('tf.compat.v1'):
+      if 'raw_ops' in full_name:
+        continue
+      symbol_links = compat_v1_symbol_links
+    elif full_name.startswith('tf.compat.v2'):
+      symbol_links = compat_v2_symbol_links
+    else:
+      symbol_links = primary_symbol_links
+
     with reference_resolver.temp_prefix('..'):
       symbol_links.append(
           (full_name, reference_resolver.python_link(full_name, full_name)))
@@ -696,37 +875,21 @@ def generate_global_index(library_name, index, reference_resolver):
   lines = [f'# All symbols in {library_name}', '']
   lines.append('<!-- Insert buttons and diff -->\n')
 
-  # Sort all the symbols once, so that the ordering is preserved when its broken
-  # up into main symbols and compat symbols and sorting the sublists is not
-  # required.
-  symbol_links = sorted(symbol_links, key=lambda x: x[0])
-
-  compat_v1_symbol_links = []
-  compat_v2_symbol_links = []
-  primary_symbol_links = []
-
-  for symbol, link in symbol_links:
-    if symbol.startswith('tf.compat.v1'):
-      if 'raw_ops' not in symbol:
-        compat_v1_symbol_links.append(link)
-    elif symbol.startswith('tf.compat.v2'):
-      compat_v2_symbol_links.append(link)
-    else:
-      primary_symbol_links.append(link)
+  # Sort each group of symbols separately, it's cheaper than sorting them all.
+  for symbol_links in (primary_symbol_links, compat_v2_symbol_links,
+                       compat_v1_symbol_links):
+    symbol_links.sort(key=lambda x: x[0])
 
   lines.append('## Primary symbols')
-  for link in primary_symbol_links:
-    lines.append(f'*  {link}')
+  lines.extend('*  ' + link for _, link in primary_symbol_links)
 
   if compat_v2_symbol_links:
     lines.append('\n## Compat v2 symbols\n')
-    for link in compat_v2_symbol_links:
-      lines.append(f'*  {link}')
+    lines.extend('*  ' + link for _, link in compat_v2_symbol_links)
 
   if compat_v1_symbol_links:
     lines.append('\n## Compat v1 symbols\n')
-    for link in compat_v1_symbol_links:
-      lines.append(f'*  {link}')
+    lines.extend('*  ' + link for _, link in compat_v1_symbol_links)
 
   # TODO(markdaoust): use a _ModulePageInfo -> prety_docs.build_md_page()
   return '\n'.join(lines)
@@ -771,13 +934,12 @@ class Metadata(object):
     """Returns the Metadata block as an Html string."""
     # Note: A schema is not a URL. It is defined with http: but doesn't resolve.
     schema = 'http://developers.google.com/ReferenceObject'
-    parts = [f'<div itemscope itemtype="{schema}">']
-
-    parts.append(f'<meta itemprop="name" content="{self.name}" />')
-    parts.append(f'<meta itemprop="path" content="{self.version}" />')
-    for item in self._content:
-      parts.append(f'<meta itemprop="property" content="{item}"/>')
-
-    parts.extend(['</div>', ''])
-
-    return '\n'.join(parts)
+    properties = ''.join(
+        f'<meta itemprop="property" content="{item}"/>\n'
+        for item in self._content)
+
+    return (f'<div itemscope itemtype="{schema}">\n'
+            f'<meta itemprop="name" content="{self.name}" />\n'
+            f'<meta itemprop="path" content="{self.version}" />\n'
+            f'{properties}'
+            '</div>\n')
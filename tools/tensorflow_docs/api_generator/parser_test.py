@@ -17,8 +17,10 @@
 
 import collections
 import dataclasses
+import importlib.util
 import inspect
 import os
+import re
 import tempfile
 import textwrap
 
@@ -152,6 +154,22 @@ class ParserTest(parameterized.TestCase):
   def test_documentation_path(self):
     self.assertEqual('test.md', parser.documentation_path('test'))
     self.assertEqual('test/module.md', parser.documentation_path('test.module'))
+    self.assertEqual(
+        'test/module.md#symbol',
+        parser.documentation_path('test.module.symbol', is_fragment=True))
+
+  def test_file_location_url(self):
+    github = 'https://github.com/tensorflow/docs/blob/master/parser.py'
+    self.assertEqual(
+        f'{github}#L10-L20',
+        parser.FileLocation(base_url=github, start_line=10, end_line=20).url)
+    self.assertEqual(github, parser.FileLocation(base_url=github).url)
+
+    other = 'https://example.com/parser.py'
+    self.assertEqual(
+        other,
+        parser.FileLocation(base_url=other, start_line=10, end_line=20).url)
+    self.assertIsNone(parser.FileLocation(start_line=10, end_line=20).url)
 
   def test_replace_references(self):
 
@@ -624,6 +642,85 @@ class ParserTest(parameterized.TestCase):
     self.assertEqual(doc_info.compatibility['numpy'],
                      'NumPy has nothing as awesome as this function.\n')
 
+  def test_memoize_by_id_per_parser_config(self):
+    calls = []
+
+    def get_len(obj):
+      calls.append(obj)
+      return len(obj)
+
+    memoized = parser._memoize_by_id(get_len)
+
+    def make_parser_config():
+      return config.ParserConfig(
+          reference_resolver=None,
+          duplicates={},
+          duplicate_of={},
+          tree={},
+          index={},
+          reverse_index={},
+          base_dir='/',
+          code_url_prefix='/')
+
+    parser_config = make_parser_config()
+    obj = [1, 2]
+
+    self.assertEqual(2, memoized(obj, parser_config))
+    self.assertEqual(2, memoized(obj, parser_config))
+    self.assertLen(calls, 1)
+
+    # Each `ParserConfig` gets its own cache.
+    self.assertEqual(2, memoized(obj, make_parser_config()))
+    self.assertLen(calls, 2)
+
+    # Calls without a `parser_config` are not cached.
+    memoized(obj)
+    memoized(obj)
+    self.assertLen(calls, 4)
+
+  def test_get_defined_in_single_file_base_dir(self):
+    mod_file = self.create_tempfile(
+        'single_mod.py', content='def func():\n  pass\n').full_path
+    spec = importlib.util.spec_from_file_location('single_mod', mod_file)
+    single_mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(single_mod)
+
+    # A single file module is its own base_dir.
+    parser_config = config.ParserConfig(
+        reference_resolver=None,
+        duplicates={},
+        duplicate_of={},
+        tree={},
+        index={},
+        reverse_index={},
+        base_dir=[mod_file],
+        code_url_prefix=['https://github.com/org/repo/single_mod.py'])
+
+    self.assertEqual(
+        parser.FileLocation(
+            base_url='https://github.com/org/repo/single_mod.py/.',
+            start_line=1,
+            end_line=2),
+        parser.get_defined_in(single_mod.func, parser_config))
+
+  def test_atat_lines_removed(self):
+    atat_re = re.compile(r' *@@[a-zA-Z_.0-9]+ *$')
+
+    def filter_lines(docstring):
+      return '\n'.join(
+          line for line in docstring.split('\n') if not atat_re.match(line))
+
+    docstrings = [
+        'Module.\n\n@@foo\n@@bar',
+        'Module.\n\n@@foo\n@@bar\n',
+        'Module.\n  @@foo\nMore text.\n',
+        '@@foo\n@@bar',
+        'Not @@foo\n@@bar  \n\n@@baz',
+    ]
+    for docstring in docstrings:
+      self.assertEqual(
+          filter_lines(docstring), parser._ATAT_LINE_RE.sub('', docstring))
+
   def test_downgrade_h1_docstrings(self):
     h1_docstring = textwrap.dedent("""\
       Hello.
@@ -655,6 +752,31 @@ class ParserTest(parameterized.TestCase):
     self.assertIn('\nReturns:', doc)
     self.assertIn('\nRaises:', doc)
 
+  def test_downgrade_h1_docstrings_skips_code(self):
+    h1_docstring = textwrap.dedent("""\
+      Hello.
+
+      ```
+      # Returns
+      ```
+
+      # Returns
+        a
+      """)
+    downgrader = parser._DowngradeH1Keywords()
+    doc = downgrader(h1_docstring)
+    self.assertIn('```\n# Returns\n```', doc)
+    self.assertIn('\n\nReturns:\n  a\n', doc)
+
+  def test_downgrade_h1_docstrings_line_breaks(self):
+    downgrader = parser._DowngradeH1Keywords()
+    # Every line boundary `str.splitlines` knows becomes a "\n".
+    self.assertEqual('\n', downgrader('\x0c'))
+    self.assertEqual('\n', downgrader('\r'))
+    self.assertEqual('a\nb\nc\nd\n', downgrader('a\r\nb\x0bc\u2028d\n'))
+    self.assertEqual('Hello.\nReturns:\n  a\n',
+                     downgrader('Hello.\r\n# Returns\r\n  a\r\n'))
+
   def test_generate_index(self):
 
     index = {
@@ -932,6 +1054,29 @@ class ParserTest(parameterized.TestCase):
 
 
 
+  def test_unwrap_obj(self):
+
+    def wrapper():
+      pass
+
+    wrapper.__wrapped__ = test_function
+    self.assertIs(test_function, parser._unwrap_obj(wrapper))
+
+    class WrapsNone(object):
+      __wrapped__ = None
+
+    wraps_none = WrapsNone()
+    self.assertIs(wraps_none, parser._unwrap_obj(wraps_none))
+
+    class WrapsItself(object):
+
+      @property
+      def __wrapped__(self):
+        return self
+
+    wraps_itself = WrapsItself()
+    self.assertIs(wraps_itself, parser._unwrap_obj(wraps_itself))
+
   def testIsClasssAttr(self):
     result = parser.is_class_attr('test_module.test_function',
                                   {'test_module': test_module})
@@ -994,7 +1139,38 @@ class TestParseDocstring(absltest.TestCase):
                      '\nSome tensors, with the same type as the input.\n')
     self.assertLen(returns.items, 2)
 
+  def test_split_title_block_at_end(self):
+    docstring = 'Hello.\n\nArgs:\n  a: first\n\n  b: second\n'
+    docstring_parts = parser.TitleBlock.split_string(docstring)
+
+    self.assertLen(docstring_parts, 3)
+    self.assertEqual(docstring_parts[0], 'Hello.')
 
+    args = docstring_parts[1]
+    self.assertEqual(args.title, 'Args')
+    self.assertEqual(args.items, [('a', 'first\n\n'), ('b', 'second')])
+    self.assertEqual(docstring_parts[2], '\n')
+
+  def test_split_title_blocks_in_series(self):
+    docstring = 'Hello.\n\nArgs:\n  a: first\nReturns:\n  Something.\nBye.'
+    docstring_parts = parser.TitleBlock.split_string(docstring)
+
+    self.assertLen(docstring_parts, 5)
+    self.assertEqual(docstring_parts[1].title, 'Args')
+    self.assertEqual(docstring_parts[2], '')
+    self.assertEqual(docstring_parts[3].title, 'Returns')
+    self.assertEqual(docstring_parts[4], '\nBye.')
+
+  def test_dedent_matches_textwrap(self):
+    texts = [
+        '',
+        'no indent\n  some indent\n',
+        '\n    a\n  b\n\n    c\n',
+        '  a\n   \n  b',
+        '\ta\n\t  b\n  c\n',
+    ]
+    for text in texts:
+      self.assertEqual(textwrap.dedent(text), parser._dedent(text))
 
   def test_strip_todos(self):
     input_str = ("""#  TODO(blah) blah
@@ -1010,8 +1186,7 @@ class TestParseDocstring(absltest.TestCase):
         middle
         goodbye
         """)
-    strip_todos = parser._StripTODOs()
-    self.assertEqual(expected, strip_todos(input_str))
+    self.assertEqual(expected, parser._STRIP_TODOS_RE.sub('', input_str))
 
   def test_strip_pylintandpyformat(self):
     input_str = textwrap.dedent("""
@@ -1041,8 +1216,8 @@ class TestParseDocstring(absltest.TestCase):
         abc
 
         """)
-    strip_todos = parser._StripPylintAndPyformat()
-    self.assertEqual(expected, strip_todos(input_str))
+    self.assertEqual(expected,
+                     parser._STRIP_PYLINT_AND_PYFORMAT_RE.sub('', input_str))
 
 
 if __name__ == '__main__':